@@ -240,36 +240,21 @@ const AppContent = () => {
   };
 
   const fetchTrendingTopics = async () => {
-    // Simulated trending topics
-    setTrendingTopics([
-      { topic: "Bitcoin ETF", volume: 12500 },
-      { topic: "Federal Reserve", volume: 8900 },
-      { topic: "Ethereum Upgrade", volume: 7200 },
-      { topic: "Market Volatility", volume: 6800 },
-      { topic: "Crypto Regulation", volume: 5400 }
-    ]);
+    try {
+      const response = await axios.get(`${API}/trending`, { params: { limit: 5 } });
+      setTrendingTopics(response.data);
+    } catch (error) {
+      console.error("Error fetching trending topics:", error);
+    }
   };
 
   const fetchMarketAlerts = async () => {
-    // Simulated market alerts
-    setMarketAlerts([
-      { 
-        id: 1, 
-        type: "price", 
-        title: "Bitcoin reaches $45,000", 
-        message: "BTC hits resistance level",
-        timestamp: new Date(Date.now() - 300000),
-        severity: "medium"
-      },
-      { 
-        id: 2, 
-        type: "volume", 
-        title: "High trading volume on ETH", 
-        message: "Ethereum sees 200% volume increase",
-        timestamp: new Date(Date.now() - 600000),
-        severity: "high"
-      }
-    ]);
+    try {
+      const response = await axios.get(`${API}/alerts`, { params: { limit: 5 } });
+      setMarketAlerts(response.data.map((alert) => ({ ...alert, timestamp: new Date(alert.timestamp) })));
+    } catch (error) {
+      console.error("Error fetching market alerts:", error);
+    }
   };
 
   const fetchReadingList = async () => {
@@ -0,0 +1,170 @@
+"""Live stream checker against a local fake stream host: round time, sockets and intervals
+
+    python backend/benchmarks/live_stream_benchmark.py [--streams 300] [--rounds 5]
+    python backend/benchmarks/live_stream_benchmark.py --mongo-url mongodb://localhost:27017
+
+Every stream's embed_url points at one keep-alive HTTP server on localhost
+whose paths behave like real embed pages: some change on every request, some
+carry a stable ETag, some only a Content-Length, some refuse HEAD and some are
+gone (404). Each round makes every stream due, runs one checker round and
+reports its wall time, the TCP connections the server accepted, and the
+outcomes. The final check intervals show the adaptation per kind of stream.
+Without --mongo-url an in-process mongomock-motor is used (pip install -r
+backend/requirements-dev.txt); with it, the DB_NAME database (default
+crypto_news_live_bench) is dropped and reseeded.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+KINDS = ("changing", "etag", "length", "no_head", "gone")
+
+class FakeStreamHost(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency):
+        super().__init__(address, FakeStreamHandler)
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+class FakeStreamHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open between probes
+    protocol_version = "HTTP/1.1"
+
+    def respond(self, head):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        kind = self.path.strip("/").split("/")[0]
+        body = b"<html>stream page</html>"
+        if kind == "gone":
+            return self.send(404, {}, b"", head)
+        if kind == "no_head":
+            if head:
+                return self.send(405, {"Allow": "GET"}, b"", head)
+            if self.headers.get("Range") == "bytes=0-0":
+                return self.send(206, {"Content-Range": f"bytes 0-0/{len(body)}"}, body[:1], head)
+        if kind == "changing":
+            return self.send(200, {"ETag": f'"{uuid.uuid4().hex}"'}, body, head)
+        if kind == "etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                return self.send(304, {"ETag": '"v1"'}, b"", head)
+            return self.send(200, {"ETag": '"v1"'}, body, head)
+        return self.send(200, {}, body, head)
+
+    def send(self, status, headers, body, head):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head and status != 304:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def log_message(self, format, *args):
+        pass
+
+def configure_environment(args):
+    """Point the app at the benchmark database; must run before importing server"""
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ.setdefault("DB_NAME", "crypto_news_live_bench")
+    os.environ["LLM_CACHE_BACKEND"] = "off"
+    os.environ["LIVE_CHECK_MAX_CONNECTIONS"] = str(args.connections)
+    if not args.mongo_url:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("mongomock-motor is not installed: pip install -r backend/requirements-dev.txt, or pass --mongo-url")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    sys.path.insert(0, BACKEND_DIR)
+
+async def run(args, base_url, host):
+    import server
+
+    await server.client.drop_database(server.DB_NAME)
+    await server.db.live_streams.insert_many([
+        server.LiveStream(
+            title=f"Stream {i}", description="", source_name="Benchmark", category="finance",
+            embed_url=f"{base_url}/{KINDS[i % len(KINDS)]}/{i}",
+        ).dict()
+        for i in range(args.streams)
+    ])
+    checker = server.live_stream_checker
+    print(f"{'round':>5} {'seconds':>8} {'sockets':>8} {'requests':>9}  outcomes")
+    try:
+        for round_number in range(1, args.rounds + 1):
+            # Make every stream due, as if its interval had elapsed
+            await server.db.live_streams.update_many(
+                {}, {"$set": {"check.next_check_at": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+            )
+            before = dict(checker.counters)
+            connections, requests = host.connections, host.requests
+            started = time.perf_counter()
+            checked = await checker.run_once(limit=args.streams)
+            seconds = time.perf_counter() - started
+            outcomes = {
+                outcome: checker.counters[outcome] - before[outcome]
+                for outcome in ("changed", "unchanged", "not_modified", "error")
+            }
+            assert checked == args.streams, f"checked {checked} of {args.streams} streams"
+            print(
+                f"{round_number:>5} {seconds:>8.2f} {host.connections - connections:>8} {host.requests - requests:>9}  "
+                + ", ".join(f"{name} {count}" for name, count in outcomes.items())
+            )
+
+        streams = await server.db.live_streams.find({}, {"embed_url": 1, "is_live": 1, "check": 1}).to_list(length=None)
+        print(f"\n{'kind':<10} {'live':>6} {'median interval s':>18}")
+        for kind in KINDS:
+            of_kind = [stream for stream in streams if f"/{kind}/" in stream["embed_url"]]
+            live = sum(stream["is_live"] for stream in of_kind)
+            interval = statistics.median(stream["check"]["interval"] for stream in of_kind)
+            print(f"{kind:<10} {live:>3}/{len(of_kind):<3}{interval:>18.0f}")
+    finally:
+        await checker.close()
+        if not args.keep_data:
+            await server.client.drop_database(server.DB_NAME)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", help="scratch Mongo to benchmark against instead of mongomock-motor")
+    parser.add_argument("--streams", type=int, default=300, help="live streams to check")
+    parser.add_argument("--rounds", type=int, default=5, help="checker rounds")
+    parser.add_argument("--connections", type=int, default=8, help="LIVE_CHECK_MAX_CONNECTIONS")
+    parser.add_argument("--latency", type=float, default=0.005, help="seconds the fake host takes per request")
+    parser.add_argument("--keep-data", action="store_true", help="leave the benchmark database in place")
+    args = parser.parse_args(argv)
+
+    configure_environment(args)
+    host = FakeStreamHost(("127.0.0.1", 0), args.latency)
+    threading.Thread(target=host.serve_forever, daemon=True).start()
+    try:
+        asyncio.run(run(args, f"http://127.0.0.1:{host.server_address[1]}", host))
+    finally:
+        host.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,503 @@
+"""Load test of every /api route and of article generation, compared against stored baselines
+
+    python backend/benchmarks/load_benchmark.py [--articles 10000] [--concurrency 32] [--duration 5]
+    python backend/benchmarks/load_benchmark.py --mongo-url mongodb://localhost:27017 --articles 1000000
+    python backend/benchmarks/load_benchmark.py --save-baseline
+
+Without --mongo-url the app runs on an in-process mongomock-motor
+(pip install -r backend/requirements-dev.txt), which is fine up to ~100k
+articles; use a scratch Mongo beyond that. mongomock scans collections instead of using indexes, so
+routes bound by Mongo lookups (search hydration, admin stats) measure the
+stand-in more than the app; compare such numbers only within one profile.
+
+The app is served by uvicorn in this process and driven over HTTP from a
+separate load-generator process, so client CPU does not skew the server's
+latencies. Data goes to the DB_NAME database (default
+crypto_news_bench), which is dropped afterwards.
+
+emergentintegrations' llm_client is replaced by FakeLLM with --llm-latency, and
+news sources point at a local fixture server, so a generation run exercises
+scraping, dedup, batched inserts and indexing without leaving the machine.
+
+Results are compared with baselines.json under the same profile (backend,
+articles, concurrency): a route whose p95 grows, or whose throughput drops, by
+more than --tolerance, or that returns errors, fails the run with exit code 1.
+Baselines are machine-specific; re-record them with --save-baseline.
+SSE/WebSocket streams and /admin/generate-now are left out of the route load.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import types
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARK_DIR, "..", "backend")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baselines.json")
+
+ADMIN_CREDENTIALS = {"username": "admin", "password": "cryptoadmin123"}
+CATEGORIES = ("finance", "crypto", "general")
+WORDS = (
+    "bitcoin ether etf inflows treasury yields rally selloff liquidity stablecoin regulator sec fed rate "
+    "inflation earnings guidance nasdaq futures options volatility miners halving custody exchange token "
+    "layer defi lending staking validator bond dollar gold oil equities outlook investors analysts"
+).split()
+# Domain words plus filler words, drawn with Zipf-like frequencies so postings have realistic skew
+_SYLLABLES = ("ka", "lo", "mi", "ter", "van", "do", "rex", "sul", "pi", "nor", "qua", "ben")
+VOCABULARY = WORDS + sorted({a + b + c for a in _SYLLABLES for b in _SYLLABLES for c in _SYLLABLES})
+VOCABULARY_WEIGHTS = [1 / rank for rank in range(1, len(VOCABULARY) + 1)]
+
+def random_text(words):
+    return " ".join(random.choices(VOCABULARY, VOCABULARY_WEIGHTS, k=words))
+
+# (name, method, path, params, extra) with {cursor}/{etag} filled in by the load generator
+ROUTES = [
+    ("root", "GET", "/api/", {}, {}),
+    ("ready", "GET", "/api/ready", {}, {}),
+    ("articles", "GET", "/api/articles", {}, {}),
+    ("articles: category", "GET", "/api/articles", {"category": "crypto"}, {}),
+    ("articles: list fields", "GET", "/api/articles", {"fields": "id,title,summary,published_at", "limit": 50}, {}),
+    ("articles: next page", "GET", "/api/articles", {"cursor": "{cursor}"}, {}),
+    ("articles: not modified", "GET", "/api/articles", {}, {"headers": {"If-None-Match": "{etag}"}}),
+    ("search", "GET", "/api/search", {"q": "bitcoin etf"}, {}),
+    ("search: prefix facets", "GET", "/api/search", {"q": "stablecoin reg", "category": "crypto"}, {}),
+    ("market-data", "GET", "/api/market-data", {}, {}),
+    ("market history", "GET", "/api/market-data/BTC/history", {"interval": "1h", "ma": "20,50"}, {}),
+    ("alerts", "GET", "/api/alerts", {}, {}),
+    ("trending", "GET", "/api/trending", {}, {}),
+    ("seo-stats", "GET", "/api/seo-stats", {}, {}),
+    ("live-streams", "GET", "/api/live-streams", {}, {}),
+    ("live-streams: category", "GET", "/api/live-streams", {"category": "crypto"}, {}),
+    ("admin login", "POST", "/api/admin/login", {}, {"json": ADMIN_CREDENTIALS}),
+    ("admin stats", "GET", "/api/admin/stats", {}, {"auth": True}),
+    ("admin cache", "GET", "/api/admin/cache", {}, {"auth": True}),
+    ("admin llm", "GET", "/api/admin/llm", {}, {"auth": True}),
+    ("admin writes", "GET", "/api/admin/writes", {}, {"auth": True}),
+    ("admin dedup", "GET", "/api/admin/dedup", {}, {"auth": True}),
+    ("admin stream", "GET", "/api/admin/stream", {}, {"auth": True}),
+    ("admin scheduler", "GET", "/api/admin/scheduler", {}, {"auth": True}),
+    ("admin hot-articles", "GET", "/api/admin/hot-articles", {}, {"auth": True}),
+    ("admin live-streams", "GET", "/api/admin/live-streams", {}, {"auth": True}),
+    ("admin trending", "GET", "/api/admin/trending", {}, {"auth": True}),
+    ("news-sources", "GET", "/api/news-sources", {}, {"auth": True}),
+]
+
+class FakeLLM:
+    """Stand-in for emergentintegrations' llm_client with tunable latency and failure rate"""
+
+    def __init__(self, latency=0.5, jitter=0.2, fail_rate=0.0):
+        self.latency, self.jitter, self.fail_rate = latency, jitter, fail_rate
+        self.calls = 0
+
+    async def chat_completion(self, messages, model):
+        self.calls += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.latency * self.jitter)))
+        if random.random() < self.fail_rate:
+            raise RuntimeError("FakeLLM: injected failure")
+        prompt = messages[-1]["content"]
+        body = random_text(400)
+        article = {
+            "title": f"{random.choice(WORDS).title()} {random.choice(WORDS)} update {uuid.uuid4().hex[:8]}",
+            "content": body,
+            "summary": body[:200],
+            "tags": random.sample(WORDS, 5),
+            "seo_keywords": random.sample(WORDS, 5),
+        }
+        content = json.dumps(article)
+        return {
+            "choices": [{"message": {"content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+        }
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """News source pages with fresh text on every request, so each generation run has new content"""
+
+    def do_GET(self):
+        paragraphs = "".join(f"<p>{random_text(60)}</p>" for _ in range(8))
+        body = f"<html><head><title>{self.path}</title></head><body><article>{paragraphs}</article></body></html>".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def configure_environment(args, workdir):
+    """Point the app at the benchmark database and scratch directories; must run before importing server"""
+    os.environ["MONGO_URL"] = args.mongo_url or "mongodb://localhost:27017"
+    os.environ.setdefault("DB_NAME", "crypto_news_bench")
+    os.environ["LLM_CACHE_BACKEND"] = "off"
+    os.environ["MARKET_PROVIDER"] = "static"
+    os.environ["SEARCH_INDEX_PATH"] = os.path.join(workdir, "search_index.npz")
+    os.environ["MARKET_HISTORY_DIR"] = os.path.join(workdir, "market_history")
+    # Synthetic live streams point at hosts that must not be probed
+    os.environ["LIVE_CHECK_ENABLED"] = "false"
+    # Every fixture source shares one host
+    os.environ.setdefault("SCRAPE_HOST_RATE_PER_SECOND", "10000")
+    os.environ.setdefault("SCRAPE_HOST_BURST", "10000")
+
+    if not args.mongo_url:
+        try:
+            import mongomock_motor
+        except ImportError:
+            sys.exit("mongomock-motor is not installed: pip install -r backend/requirements-dev.txt, or pass --mongo-url")
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+
+    fake_llm = FakeLLM(args.llm_latency, args.llm_jitter, args.llm_fail_rate)
+    sys.modules["emergentintegrations"] = types.SimpleNamespace(llm_client=fake_llm)
+    sys.path.insert(0, BACKEND_DIR)
+    return fake_llm
+
+def synthetic_article(published_at):
+    category = random.choice(CATEGORIES)
+    body = random_text(300)
+    return {
+        "id": str(uuid.uuid4()),
+        "title": random_text(8).capitalize(),
+        "content": body,
+        "summary": body[:200],
+        "category": category,
+        "tags": random.sample(WORDS, 4) + [category],
+        "seo_keywords": random.sample(WORDS, 5),
+        "published_at": published_at,
+        "source_name": "Benchmark",
+        "source_attribution": "Information sourced from Benchmark",
+        "ai_generated": True,
+    }
+
+def synthetic_live_stream(index):
+    return {
+        "id": str(uuid.uuid4()),
+        "title": f"Market live {index}",
+        "description": random_text(20),
+        "source_name": "Benchmark",
+        "embed_url": f"https://www.youtube.com/embed/bench{index}",
+        "category": random.choice(CATEGORIES),
+        "language": "en",
+        "is_live": True,
+        "viewers_count": random.randint(0, 50000),
+        "started_at": datetime.now(timezone.utc) - timedelta(minutes=index),
+        "tags": random.sample(WORDS, 3),
+        "region": "global",
+    }
+
+async def insert_batches(collection, documents, batch_size=1000):
+    batch = []
+    for document in documents:
+        batch.append(document)
+        if len(batch) == batch_size:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+
+async def seed(server, articles, live_streams, fixture_url, sources):
+    """Synthetic articles, live streams, a week of minute bars and fixture-backed news sources"""
+    started = time.perf_counter()
+    # Indexes are built by the app's startup, after the bulk load
+    await server.client.drop_database(server.DB_NAME)
+    now = datetime.now(timezone.utc)
+    await insert_batches(server.db.articles, (synthetic_article(now - timedelta(minutes=i)) for i in range(articles)))
+    await insert_batches(server.db.live_streams, (synthetic_live_stream(i) for i in range(live_streams)))
+    await server.db.news_sources.insert_many([
+        server.NewsSource(
+            name=f"Fixture source {i}", url=f"{fixture_url}/source/{i}", category=CATEGORIES[i % len(CATEGORIES)]
+        ).dict()
+        for i in range(sources)
+    ])
+
+    end = int(now.timestamp()) // 60 * 60
+    market_history = server.open_market_history()
+    for instrument in server.MARKET_INSTRUMENTS:
+        price = instrument["price"]
+        for ts in range(end - 7 * 86400, end, 60):
+            price *= 1 + random.gauss(0, 0.001)
+            market_history.record_tick(instrument["symbol"], ts, price, random.random() * 10)
+    return time.perf_counter() - started
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+async def drive_route(client, route, context, concurrency, duration, warmup):
+    name, method, path, params, extra = route
+    params = {key: str(value).format(**context) for key, value in params.items()}
+    headers = {key: value.format(**context) for key, value in extra.get("headers", {}).items()}
+    if extra.get("auth"):
+        headers["Authorization"] = f"Bearer {context['token']}"
+    request = dict(params=params, headers=headers, json=extra.get("json"))
+
+    for _ in range(warmup):
+        await client.request(method, path, **request)
+
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **request)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return name, {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+async def drive(base_url, routes, concurrency, duration, warmup):
+    import httpx
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        first_page = await client.get("/api/articles")
+        login = await client.post("/api/admin/login", json=ADMIN_CREDENTIALS)
+        context = {
+            "cursor": first_page.headers.get("X-Next-Cursor", ""),
+            "etag": first_page.headers.get("ETag", ""),
+            "token": login.json()["access_token"],
+        }
+        return dict([await drive_route(client, route, context, concurrency, duration, warmup) for route in routes])
+
+def load_generator(connection, base_url, routes, concurrency, duration, warmup):
+    """Entry point of the load-generator process"""
+    try:
+        connection.send(asyncio.run(drive(base_url, routes, concurrency, duration, warmup)))
+    except Exception as e:
+        connection.send(e)
+    finally:
+        connection.close()
+
+async def run_load(base_url, args):
+    """Drive every route from a separate process and wait for its results"""
+    context = multiprocessing.get_context("spawn")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(
+        target=load_generator, args=(sender, base_url, ROUTES, args.concurrency, args.duration, args.warmup)
+    )
+    process.start()
+    sender.close()
+    results = await asyncio.to_thread(receiver.recv)
+    await asyncio.to_thread(process.join)
+    if isinstance(results, Exception):
+        raise results
+    return results
+
+async def run_generation(server, fake_llm, args):
+    """Generation runs over the fixture sources: wall time, throughput and LLM calls"""
+    await server.db.news_sources.update_many({"name": {"$not": {"$regex": "^Fixture source"}}}, {"$set": {"is_active": False}})
+    # The near-duplicate index backfills once per process; time it apart from the runs
+    started = time.perf_counter()
+    await server.duplicate_detector.ensure_loaded()
+    dedup_load_seconds = time.perf_counter() - started
+    calls_before, durations, inserted = fake_llm.calls, [], 0
+    for _ in range(args.generation_runs):
+        started = time.perf_counter()
+        inserted += await server.generate_articles_from_sources(llm=fake_llm, sources_per_run=args.sources)
+        durations.append(time.perf_counter() - started)
+    await asyncio.gather(*(writer.flush() for writer in server.bulk_writers.values()))
+    total = sum(durations)
+    return {
+        "runs": args.generation_runs,
+        "sources_per_run": args.sources,
+        "llm_latency_s": args.llm_latency,
+        "dedup_load_s": round(dedup_load_seconds, 3),
+        "articles": inserted,
+        "llm_calls": fake_llm.calls - calls_before,
+        "run_median_s": round(statistics.median(durations), 3),
+        "articles_per_second": round(inserted / total, 2) if total else 0.0,
+    }
+
+async def run(args, fake_llm):
+    import uvicorn
+    import server
+
+    fixture = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=fixture.serve_forever, daemon=True).start()
+    fixture_url = f"http://127.0.0.1:{fixture.server_port}"
+
+    rss_before = rss_mb()
+    seed_seconds = await seed(server, args.articles, args.live_streams, fixture_url, args.sources)
+    # Generation is benchmarked on its own, not fired by the scheduler mid-load
+    server.scheduler.jobs.pop("generate_articles", None)
+
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning", lifespan="on")
+    uvicorn_server = uvicorn.Server(config)
+    serving = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        if serving.done():
+            await serving
+            raise RuntimeError("uvicorn exited during startup")
+        await asyncio.sleep(0.05)
+    port = uvicorn_server.servers[0].sockets[0].getsockname()[1]
+    # Warm-up runs behind the open port; measure the warmed-up app
+    while not server.warm_up.ready:
+        await asyncio.sleep(0.05)
+    rss_seeded = rss_mb()
+
+    try:
+        routes = await run_load(f"http://127.0.0.1:{port}", args)
+        rss_loaded = rss_mb()
+        generation = await run_generation(server, fake_llm, args) if args.generation_runs else None
+    finally:
+        uvicorn_server.should_exit = True
+        await serving
+        fixture.shutdown()
+        if not args.keep_data:
+            await server.client.drop_database(server.DB_NAME)
+
+    return {
+        "profile": profile_key(args),
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "seed_seconds": round(seed_seconds, 2),
+        "memory_mb": {
+            "before_seed": round(rss_before, 1),
+            "after_seed_and_startup": round(rss_seeded, 1),
+            "after_load": round(rss_loaded, 1),
+            "peak": round(peak_rss_mb(), 1),
+        },
+        "routes": routes,
+        "generation": generation,
+    }
+
+def profile_key(args):
+    backend = "mongo" if args.mongo_url else "mongomock"
+    return f"{backend}-{args.articles}-articles-c{args.concurrency}"
+
+def compare(results, baseline, tolerance):
+    """Regression messages for routes or generation worse than the baseline by more than ``tolerance``
+
+    A route missing from the baseline is reported too, so a newly benchmarked
+    route cannot go unchecked until someone re-records.
+    """
+    regressions = []
+    for name, current in results["routes"].items():
+        if current["errors"]:
+            regressions.append(f"{name}: {current['errors']} of {current['requests']} requests failed")
+        previous = baseline.get("routes", {}).get(name)
+        if previous is None:
+            regressions.append(f"{name}: no baseline for this route; re-record with --save-baseline")
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms vs baseline {previous['p95_ms']} ms")
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rps']} req/s vs baseline {previous['rps']} req/s")
+    current, previous = results.get("generation"), baseline.get("generation")
+    if current and previous and current["articles_per_second"] < previous["articles_per_second"] * (1 - tolerance):
+        regressions.append(
+            f"generation: {current['articles_per_second']} articles/s vs baseline {previous['articles_per_second']}"
+        )
+    return regressions
+
+def print_report(results, baseline):
+    baseline_routes = (baseline or {}).get("routes", {})
+    print(f"profile {results['profile']}, seeded in {results['seed_seconds']}s")
+    print(f"{'route':<26}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'p95 vs base':>13}")
+    for name, row in results["routes"].items():
+        previous = baseline_routes.get(name)
+        delta = f"{(row['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%" if previous and previous["p95_ms"] else "-"
+        print(f"{name:<26}{row['rps']:>9.0f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+              f"{row['errors']:>8}{delta:>13}")
+    print("memory MB: " + ", ".join(f"{key} {value}" for key, value in results["memory_mb"].items()))
+    if results["generation"]:
+        print("generation: " + ", ".join(f"{key} {value}" for key, value in results["generation"].items()))
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", help="scratch Mongo to benchmark against instead of mongomock-motor")
+    parser.add_argument("--articles", type=int, default=10000, help="synthetic articles to seed")
+    parser.add_argument("--live-streams", type=int, default=200, help="synthetic live streams to seed")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of load per route")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests per route")
+    parser.add_argument("--port", type=int, default=0, help="port to serve the app on (default: any free port)")
+    parser.add_argument("--sources", type=int, default=12, help="fixture news sources per generation run")
+    parser.add_argument("--generation-runs", type=int, default=3, help="generation runs to time (0 to skip)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="mean FakeLLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.2, help="FakeLLM latency standard deviation, relative")
+    parser.add_argument("--llm-fail-rate", type=float, default=0.0, help="fraction of FakeLLM calls that raise")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with and save to")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative regression before failing")
+    parser.add_argument("--save-baseline", action="store_true", help="record these results as the profile's baseline")
+    parser.add_argument("--json", action="store_true", help="print the raw results as JSON")
+    parser.add_argument("--keep-data", action="store_true", help="leave the benchmark database in place")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="cryptoai-bench-")
+    try:
+        fake_llm = configure_environment(args, workdir)
+        results = asyncio.run(run(args, fake_llm))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baselines = load_baselines(args.baseline)
+    baseline = baselines.get(results["profile"])
+    if args.json:
+        print(json.dumps(results, indent=2))
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        baselines[results["profile"]] = results
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print("no baseline for this profile; record one with --save-baseline")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regressions against the baseline recorded {baseline['recorded_at']}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
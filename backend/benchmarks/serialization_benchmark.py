@@ -0,0 +1,103 @@
+"""Per-request CPU of serializing article lists: legacy, validated and trusted paths
+
+    python backend/benchmarks/serialization_benchmark.py [--repeat 200]
+
+No database is needed; documents are synthesized in the shapes Mongo returns.
+- legacy: ISO-string dates and ObjectId _id, walked by the old convert_mongo_doc,
+  validated against List[Article] and encoded by jsonable_encoder + json.dumps
+- validated: BSON datetimes with _id projected out, validated against
+  List[Article] and encoded with orjson (the default path)
+- trusted: the same documents straight to orjson (TRUSTED_READS=true)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+from bson import ObjectId  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+import server  # noqa: E402
+
+SIZES = (20, 100, 500)
+
+def legacy_convert_mongo_doc(doc):
+    """convert_mongo_doc as it was before the serialization rework"""
+    if doc and '_id' in doc:
+        doc['_id'] = str(doc['_id'])
+    for key, value in doc.items():
+        if isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict) and '_id' in item:
+                    item['_id'] = str(item['_id'])
+    return doc
+
+def make_articles(count):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Bitcoin ETF inflows reach a new weekly record ({i})",
+            "content": "According to CoinDesk, " + "institutional demand keeps building across spot markets. " * 60,
+            "summary": "Spot bitcoin ETFs took in record inflows this week as institutions added exposure.",
+            "category": "crypto",
+            "tags": ["breaking-news", "crypto", "market-analysis", "financial-update", "bitcoin-etf"],
+            "seo_keywords": ["bitcoin etf", "crypto", "breaking news", "market analysis", "financial update"],
+            "source_name": "CoinDesk",
+            "source_attribution": "Information sourced from CoinDesk",
+            "published_at": now - timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+def as_legacy_documents(documents):
+    """The documents as stored before: ISO string dates, ObjectId _id not projected out"""
+    return [dict(doc, _id=ObjectId(), published_at=doc["published_at"].isoformat()) for doc in documents]
+
+async def legacy(field, documents):
+    content = await serialize_response(field=field, response_content=[legacy_convert_mongo_doc(doc) for doc in documents])
+    return JSONResponse(content).body
+
+async def validated(field, documents):
+    content = await serialize_response(field=field, response_content=documents)
+    return server.APIJSONResponse(content).body
+
+async def trusted(field, documents):
+    return server.APIJSONResponse(documents).body
+
+async def measure(path, field, documents, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.process_time()
+        await path(field, documents)
+        samples.append(time.process_time() - started)
+    return statistics.median(samples) * 1e6
+
+async def run(repeat):
+    field = create_response_field(name="Response_get_articles", type_=List[server.Article])
+    paths = (("legacy", legacy), ("validated", validated), ("trusted", trusted))
+    print(f"{'articles':>8} " + " ".join(f"{name + ' us':>13}" for name, _ in paths) + f" {'speedup':>9}")
+    for size in SIZES:
+        documents = make_articles(size)
+        inputs = {"legacy": as_legacy_documents(documents)}
+        results = [await measure(path, field, inputs.get(name, documents), repeat) for name, path in paths]
+        print(f"{size:>8} " + " ".join(f"{value:>13.0f}" for value in results) + f" {results[0] / results[-1]:>8.1f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="requests measured per size and path")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.repeat))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Cold-start timings: import, time to the first /api/articles response and time until /api/ready
+
+    python backend/benchmarks/startup_benchmark.py [--articles 20000] [--repeat 3]
+    python backend/benchmarks/startup_benchmark.py --mongo-url mongodb://localhost:27017
+
+Each run boots the app in a fresh interpreter with an empty search-index
+directory, as on a freshly started Render instance, once per STARTUP_WARMUP
+mode. Without --mongo-url the child process seeds an in-process mongomock-motor
+(pip install -r backend/requirements-dev.txt) with --articles synthetic
+articles before serving; with it, the DB_NAME database is used as it is. Generation on startup is
+disabled so the LLM does not take part.
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(BENCHMARK_DIR, "..", "backend")
+MODES = ("blocking", "background")
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def serve(args):
+    """Child process: import the app, seed mongomock if needed, then serve it"""
+    import asyncio
+
+    if not args.mongo_url:
+        import mongomock_motor
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    sys.path.insert(0, BACKEND_DIR)
+
+    started = time.perf_counter()
+    import server
+    import_seconds = time.perf_counter() - started
+
+    import uvicorn
+    from load_benchmark import insert_batches, synthetic_article
+    from datetime import datetime, timedelta, timezone
+
+    async def main():
+        if not args.mongo_url:
+            now = datetime.now(timezone.utc)
+            await insert_batches(
+                server.db.articles, (synthetic_article(now - timedelta(minutes=i)) for i in range(args.articles))
+            )
+        print(json.dumps({"import_s": import_seconds, "serving_at": time.time()}), flush=True)
+        config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(main())
+
+def wait_for(url, deadline):
+    """Wall-clock time at which ``url`` first answers 200"""
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.time()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not answer 200 in time")
+
+def cold_start(args, mode):
+    workdir = tempfile.mkdtemp(prefix="cryptoai-startup-")
+    port = free_port()
+    env = dict(
+        os.environ,
+        MONGO_URL=args.mongo_url or "mongodb://localhost:27017",
+        STARTUP_WARMUP=mode,
+        GENERATION_ON_STARTUP="false",
+        LLM_CACHE_BACKEND="off",
+        LIVE_CHECK_ENABLED="false",
+        SEARCH_INDEX_PATH=os.path.join(workdir, "search_index.npz"),
+        MARKET_HISTORY_DIR=os.path.join(workdir, "market_history"),
+    )
+    command = [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(port), "--articles", str(args.articles)]
+    if args.mongo_url:
+        command += ["--mongo-url", args.mongo_url]
+    child = subprocess.Popen(command, env=env, cwd=workdir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        line = child.stdout.readline()
+        if not line:
+            raise RuntimeError(f"{mode}: the app exited before serving")
+        boot = json.loads(line)
+        base = f"http://127.0.0.1:{port}/api"
+        deadline = time.time() + args.timeout
+        first_response = wait_for(f"{base}/articles?limit=1", deadline)
+        ready = wait_for(f"{base}/ready", deadline)
+        return {
+            "import_ms": boot["import_s"] * 1000,
+            "first_response_ms": (first_response - boot["serving_at"] + boot["import_s"]) * 1000,
+            "ready_ms": (ready - boot["serving_at"] + boot["import_s"]) * 1000,
+        }
+    finally:
+        child.terminate()
+        child.wait(10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", help="scratch Mongo to boot against instead of mongomock-motor")
+    parser.add_argument("--articles", type=int, default=20000, help="synthetic articles seeded into mongomock")
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts per mode")
+    parser.add_argument("--timeout", type=float, default=300, help="seconds to wait for each cold start")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args)
+        return 0
+
+    print(f"{'warm-up':<12}{'import ms':>11}{'first response ms':>19}{'ready ms':>10}")
+    for mode in MODES:
+        runs = [cold_start(args, mode) for _ in range(args.repeat)]
+        medians = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"{mode:<12}{medians['import_ms']:>11.0f}{medians['first_response_ms']:>19.0f}{medians['ready_ms']:>10.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
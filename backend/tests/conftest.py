@@ -0,0 +1,72 @@
+"""Shared fixtures: the app on an in-process Mongo and local HTTP servers
+
+    pip install -r backend/requirements-dev.txt
+    python -m pytest -q backend/tests
+
+server is imported once, after the environment below is set. Tests run on
+mongomock-motor unless TEST_MONGO_URL points at a scratch Mongo, whose
+DB_NAME database (default crypto_news_test) is dropped before every test.
+Coroutines run on one event loop for the whole session, since the app's Mongo
+client and HTTP clients are bound to the loop they first ran on.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+TEST_MONGO_URL = os.environ.get("TEST_MONGO_URL")
+
+os.environ["MONGO_URL"] = TEST_MONGO_URL or "mongodb://localhost:27017"
+os.environ.setdefault("DB_NAME", "crypto_news_test")
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="cryptoai-tests-")
+os.environ["LLM_CACHE_BACKEND"] = "off"
+os.environ["LIVE_CHECK_ENABLED"] = "false"
+os.environ["SCRAPE_PARSE_WORKERS"] = "0"
+if not TEST_MONGO_URL:
+    import mongomock_motor
+    import motor.motor_asyncio
+
+    motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+sys.path.insert(0, BACKEND_DIR)
+
+import server  # noqa: E402
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.run_until_complete(server.source_scraper.close())
+    loop.run_until_complete(server.live_stream_checker.close())
+    loop.close()
+
+@pytest.fixture
+def run(loop):
+    """Run a coroutine to completion on the session loop"""
+    return loop.run_until_complete
+
+@pytest.fixture(autouse=True)
+def clean_db(run):
+    run(server.client.drop_database(server.DB_NAME))
+
+@pytest.fixture
+def http_server():
+    """Start a ThreadingHTTPServer for a handler class on localhost; shut down after the test"""
+    started = []
+
+    def start(handler):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        httpd.daemon_threads = True
+        httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}"
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        started.append(httpd)
+        return httpd
+
+    yield start
+    for httpd in started:
+        httpd.shutdown()
+        httpd.server_close()
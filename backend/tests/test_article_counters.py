@@ -0,0 +1,35 @@
+"""The article counters document stays bounded as days go by"""
+from datetime import datetime, timedelta, timezone
+
+import server
+
+def article(number, published_at):
+    return {"id": f"a{number}", "title": "t", "summary": "", "content": "", "category": "crypto",
+            "published_at": published_at}
+
+def counters(run):
+    return run(server.db.article_counters.find_one({"_id": server.ARTICLE_COUNTERS_ID}))
+
+def test_rebuild_keeps_only_the_recent_days(run):
+    now = datetime.now(timezone.utc)
+    articles = [article(number, now - timedelta(days=number)) for number in range(10)]
+    run(server.db.articles.insert_many([dict(doc) for doc in articles]))
+
+    rebuilt = run(server.rebuild_article_counters())
+
+    assert rebuilt["total"] == 10
+    assert sorted(rebuilt["by_day"]) == [(now - timedelta(days=1)).date().isoformat(), now.date().isoformat()]
+
+def test_inserts_drop_the_day_that_left_the_window(run):
+    now = datetime.now(timezone.utc)
+    stale_day = (now - timedelta(days=server.ARTICLE_COUNTER_DAYS)).date().isoformat()
+    run(server.rebuild_article_counters())
+    run(server.db.article_counters.update_one({"_id": server.ARTICLE_COUNTERS_ID}, {"$set": {f"by_day.{stale_day}": 5}}))
+
+    run(server.record_article_counters(article(1, now)))
+    # An old article still counts towards the totals, not towards by_day
+    run(server.record_article_counters(article(2, now - timedelta(days=30))))
+
+    stored = counters(run)
+    assert stored["total"] == 2
+    assert stored["by_day"] == {now.date().isoformat(): 1}
@@ -0,0 +1,142 @@
+"""generate_articles_from_sources against a fake llm_client with latency, failures and hangs"""
+import asyncio
+import json
+import time
+import uuid
+
+import pytest
+
+import server
+
+class FakeLLM:
+    """llm_client stand-in; behaviour is chosen per source by the name in the prompt
+
+    ``failures`` maps a source name to how many calls fail before one succeeds;
+    sources in ``hang`` never answer.
+    """
+
+    def __init__(self, latency=0.05, failures=None, hang=()):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.hang = set(hang)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def chat_completion(self, messages, model):
+        prompt = messages[-1]["content"]
+        name = prompt.split("SOURCE: ", 1)[1].split("\n", 1)[0]
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if name in self.hang:
+                await asyncio.Event().wait()
+            await asyncio.sleep(self.latency)
+            if self.failures.get(name, 0) > 0:
+                self.failures[name] -= 1
+                raise RuntimeError(f"FakeLLM: injected failure for {name}")
+        finally:
+            self.in_flight -= 1
+        # Unique words keep the articles apart for the near-duplicate detector
+        body = " ".join(uuid.uuid4().hex for _ in range(120))
+        article = {"title": f"{name} {uuid.uuid4().hex[:8]}", "content": body, "summary": body[:200],
+                   "tags": ["crypto"], "seo_keywords": ["bitcoin"]}
+        return {"choices": [{"message": {"content": json.dumps(article)}}]}
+
+@pytest.fixture(autouse=True)
+def generation_settings(monkeypatch):
+    monkeypatch.setattr(server, "SCRAPE_ENABLED", False)
+    monkeypatch.setattr(server, "GENERATION_CONCURRENCY", 4)
+    monkeypatch.setattr(server, "LLM_RETRY_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(server, "LLM_TIMEOUT_SECONDS", 5.0)
+
+def add_sources(run, count):
+    sources = [server.NewsSource(name=f"Source {i}", url=f"http://127.0.0.1:9/{i}", category="crypto") for i in range(count)]
+    run(server.db.news_sources.insert_many([source.dict() for source in sources]))
+    return [source.name for source in sources]
+
+def stored_sources(run):
+    return sorted(doc["source_name"] for doc in run(server.db.articles.find({}, {"source_name": 1}).to_list(length=None)))
+
+def test_sources_run_concurrently_up_to_the_cap(run):
+    names = add_sources(run, 12)
+    llm = FakeLLM(latency=0.2)
+
+    started = time.perf_counter()
+    generated = run(server.generate_articles_from_sources(llm=llm, sources_per_run=12))
+    elapsed = time.perf_counter() - started
+
+    assert generated == 12
+    assert stored_sources(run) == sorted(names)
+    assert llm.max_in_flight == 4
+    # Three waves of four calls, not twelve calls back to back
+    assert elapsed < 12 * 0.2 / 2
+
+def test_failed_calls_are_retried(run, monkeypatch):
+    monkeypatch.setattr(server, "LLM_MAX_RETRIES", 2)
+    names = add_sources(run, 4)
+    llm = FakeLLM(failures={names[0]: 1, names[1]: 2, names[2]: 3})
+
+    generated = run(server.generate_articles_from_sources(llm=llm, sources_per_run=4))
+
+    # Source 2 fails more often than the retries allow; the others recover
+    assert generated == 3
+    assert stored_sources(run) == sorted([names[0], names[1], names[3]])
+    assert llm.calls == 2 + 3 + 3 + 1
+
+def test_hanging_calls_time_out_without_holding_up_the_run(run, monkeypatch):
+    monkeypatch.setattr(server, "LLM_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(server, "LLM_MAX_RETRIES", 1)
+    names = add_sources(run, 6)
+    # The same long brief per source every run, so a prompt still claimed from the first run is skipped
+    briefs = {name: " ".join(uuid.uuid4().hex for _ in range(60)) for name in names}
+
+    async def page_brief(source, category):
+        return "Bitcoin", briefs[source["name"]]
+
+    monkeypatch.setattr(server, "page_brief", page_brief)
+    llm = FakeLLM(hang={names[0], names[1]})
+
+    started = time.perf_counter()
+    generated = run(server.generate_articles_from_sources(llm=llm, sources_per_run=6))
+
+    assert generated == 4
+    assert stored_sources(run) == sorted(names[2:])
+    assert time.perf_counter() - started < 2
+
+    # Timed-out prompts are not remembered as used, so only those sources are tried again
+    assert run(server.generate_articles_from_sources(llm=FakeLLM(), sources_per_run=6)) == 2
+    assert stored_sources(run) == sorted(names)
+
+def test_a_run_survives_every_call_failing(run, monkeypatch):
+    monkeypatch.setattr(server, "LLM_MAX_RETRIES", 0)
+    names = add_sources(run, 3)
+    llm = FakeLLM(failures={name: 1 for name in names})
+
+    assert run(server.generate_articles_from_sources(llm=llm, sources_per_run=3)) == 0
+    assert stored_sources(run) == []
+
+def test_stored_article_counts_even_if_follow_up_writes_fail(run, monkeypatch):
+    names = add_sources(run, 2)
+
+    async def failing_counters(article_dict):
+        raise RuntimeError("counters unavailable")
+
+    def failing_index(article_dict):
+        raise RuntimeError("index full")
+
+    monkeypatch.setattr(server, "record_article_counters", failing_counters)
+    monkeypatch.setattr(server.search_index, "add", failing_index)
+    invalidated = []
+
+    async def invalidate(*tags):
+        invalidated.extend(tags)
+
+    monkeypatch.setattr(server.response_cache, "invalidate", invalidate)
+
+    assert run(server.generate_articles_from_sources(llm=FakeLLM(), sources_per_run=2)) == 2
+    assert stored_sources(run) == sorted(names)
+    # The steps after the failing ones still ran
+    assert "articles:crypto" in invalidated
+    assert run(server.db.article_signatures.count_documents({})) == 2
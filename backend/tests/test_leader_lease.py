@@ -0,0 +1,110 @@
+"""LeaderLease with two instances contending for one job_locks document"""
+import asyncio
+
+import pytest
+from pymongo import InsertOne
+
+import server
+
+@pytest.fixture
+def leases():
+    """Two would-be leaders on the same lock, with a short TTL so expiry takes milliseconds"""
+    collection = server.db.job_locks
+    return (
+        server.LeaderLease(collection, "test_job", "worker-a", ttl_seconds=0.3, heartbeat_seconds=0.1),
+        server.LeaderLease(collection, "test_job", "worker-b", ttl_seconds=0.3, heartbeat_seconds=0.1),
+    )
+
+def test_only_one_instance_acquires(run, leases):
+    a, b = leases
+    assert run(a.acquire()) is True
+    assert run(b.acquire()) is False
+    assert a.is_leader and not b.is_leader
+    run(a.check())
+
+def test_renewal_keeps_the_lease_past_its_ttl(run, leases):
+    a, b = leases
+    run(a.acquire())
+    for _ in range(4):
+        run(asyncio.sleep(0.1))
+        assert run(a.renew()) is not None
+        assert run(b.acquire()) is False
+    assert a.is_leader
+
+def test_expired_lease_is_taken_over_with_a_larger_token(run, leases):
+    a, b = leases
+    run(a.acquire())
+    first_token = a.token
+    run(asyncio.sleep(0.35))
+
+    assert run(b.acquire()) is True
+    assert b.token > first_token
+    # The old holder finds out on its next heartbeat or check
+    assert run(a.renew()) is None
+    assert not a.is_leader
+
+def test_release_lets_the_other_instance_in_at_once(run, leases):
+    a, b = leases
+    run(a.acquire())
+    run(a.release())
+    assert run(b.acquire()) is True
+
+def test_stale_token_is_rejected_at_flush(run, leases):
+    a, b = leases
+    run(a.acquire())
+    writer = server.BulkWriter(server.db.fenced_writes, max_delay=0.01)
+
+    run(writer.write(InsertOne({"_id": "while leading"}), fence=a.check))
+
+    # a stalls past its TTL while b takes over; a still believes it leads until it checks
+    a._valid_until += 10
+    run(asyncio.sleep(0.35))
+    run(b.acquire())
+    with pytest.raises(server.LeaseLostError):
+        run(writer.write(InsertOne({"_id": "after takeover"}), fence=a.check))
+    run(writer.write(InsertOne({"_id": "new leader"}), fence=b.check))
+
+    stored = run(server.db.fenced_writes.distinct("_id"))
+    assert sorted(stored) == ["new leader", "while leading"]
+    assert a.token is None
+
+def test_fence_failure_only_drops_its_own_operations(run, leases):
+    a, b = leases
+    run(b.acquire())
+    writer = server.BulkWriter(server.db.fenced_writes, max_delay=0.05)
+
+    async def both():
+        return await asyncio.gather(
+            writer.write(InsertOne({"_id": "unfenced"})),
+            writer.write(InsertOne({"_id": "fenced"}), fence=a.check),
+            return_exceptions=True,
+        )
+
+    unfenced, fenced = run(both())
+    assert not isinstance(unfenced, Exception)
+    assert isinstance(fenced, server.LeaseLostError)
+    assert run(server.db.fenced_writes.distinct("_id")) == ["unfenced"]
+
+def test_request_run_reaches_the_live_holder(run, leases):
+    a, b = leases
+    requested = []
+    a.on_run_requested = lambda: requested.append("a")
+    run(a.acquire())
+
+    assert run(b.request_run()) is True
+    run(a.heartbeat())
+    assert requested == ["a"]
+    # The request is consumed, so the next heartbeat does not run the job again
+    run(a.heartbeat())
+    assert requested == ["a"]
+
+def test_request_run_without_a_holder_waits_for_the_next_leader(run, leases):
+    a, b = leases
+    requested = []
+    b.on_run_requested = lambda: requested.append("b")
+
+    # No lock document yet: the request creates it already expired
+    assert run(a.request_run()) is False
+    run(b.heartbeat())
+    assert b.is_leader
+    assert requested == ["b"]
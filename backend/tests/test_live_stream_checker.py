@@ -0,0 +1,160 @@
+"""LiveStreamChecker.run_once against a fake stream host: intervals, live/offline transitions and sockets"""
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import server
+
+class FakeStreamHandler(BaseHTTPRequestHandler):
+    """Embed pages by the first path segment: a new ETag on every request, a stable ETag,
+    HEAD refused, or 404; paths in ``self.server.down`` answer 404 too"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def respond(self, head):
+        kind = self.path.strip("/").split("/")[0]
+        body = b"<html>stream page</html>"
+        if kind == "gone" or self.path in self.server.down:
+            return self.send(404, {}, b"", head)
+        if kind == "no_head":
+            if head:
+                return self.send(405, {"Allow": "GET"}, b"", head)
+            return self.send(206, {"Content-Range": f"bytes 0-0/{len(body)}"}, body[:1], head)
+        if kind == "changing":
+            return self.send(200, {"ETag": f'"{uuid.uuid4().hex}"'}, body, head)
+        if self.headers.get("If-None-Match") == '"v1"':
+            return self.send(304, {"ETag": '"v1"'}, b"", head)
+        return self.send(200, {"ETag": '"v1"'}, body, head)
+
+    def send(self, status, headers, body, head):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head and status != 304:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond(head=False)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def host(http_server):
+    httpd = http_server(FakeStreamHandler)
+    httpd.down, httpd.connections, httpd.lock = set(), 0, threading.Lock()
+    return httpd
+
+@pytest.fixture
+def checker(run):
+    checker = server.LiveStreamChecker(max_connections=2, timeout=5, min_interval=60, max_interval=1800)
+    yield checker
+    run(checker.close())
+
+def add_streams(run, host, *paths, **fields):
+    streams = [
+        server.LiveStream(title=path, description="", source_name="Test", category="crypto",
+                          embed_url=f"{host.url}{path}", **fields).dict()
+        for path in paths
+    ]
+    run(server.db.live_streams.insert_many([dict(stream) for stream in streams]))
+    return streams
+
+def check_round(run, checker):
+    """One checker round with every stream due, as if its interval had elapsed"""
+    run(server.db.live_streams.update_many(
+        {"check": {"$exists": True}},
+        {"$set": {"check.next_check_at": datetime.now(timezone.utc) - timedelta(seconds=1)}},
+    ))
+    return run(checker.run_once())
+
+def stream_states(run):
+    streams = run(server.db.live_streams.find({}, {"_id": 0}).to_list(length=None))
+    return {stream["title"]: stream for stream in streams}
+
+def test_intervals_shrink_for_changing_pages_and_grow_for_stable_ones(run, host, checker):
+    add_streams(run, host, "/changing/1", "/etag/1", "/no_head/1", "/gone/1")
+
+    assert check_round(run, checker) == 4
+    states = stream_states(run)
+    # First probe: every reachable page counts as changed, the interval starts at the minimum
+    assert {title: state["check"]["status"] for title, state in states.items()} == {
+        "/changing/1": "changed", "/etag/1": "changed", "/no_head/1": "changed", "/gone/1": "error",
+    }
+    assert states["/etag/1"]["check"]["interval"] == 60
+    assert states["/gone/1"]["check"]["interval"] == 120
+
+    for _ in range(2):
+        check_round(run, checker)
+    states = stream_states(run)
+    assert states["/changing/1"]["check"]["status"] == "changed"
+    assert states["/changing/1"]["check"]["interval"] == 60
+    # The stable ETag is sent back and answered with a 304
+    assert states["/etag/1"]["check"]["status"] == "not_modified"
+    assert states["/etag/1"]["check"]["interval"] == 60 * 1.5 * 1.5
+    # HEAD refused: a range GET gives the page size, which has not changed
+    assert states["/no_head/1"]["check"]["status"] == "unchanged"
+    assert states["/no_head/1"]["check"]["interval"] == 60 * 1.5 * 1.5
+    assert states["/gone/1"]["check"]["interval"] == 60 * 2 ** 3
+
+    next_check_at = states["/etag/1"]["check"]["next_check_at"].replace(tzinfo=timezone.utc)
+    last_checked = states["/etag/1"]["check"]["last_checked"].replace(tzinfo=timezone.utc)
+    assert 0.9 * 135 <= (next_check_at - last_checked).total_seconds() <= 1.1 * 135
+
+def test_interval_stays_within_bounds(run, host, checker):
+    add_streams(run, host, "/etag/1", "/gone/1")
+    for _ in range(12):
+        check_round(run, checker)
+    states = stream_states(run)
+    assert states["/etag/1"]["check"]["interval"] == 1800
+    assert states["/gone/1"]["check"]["interval"] == 1800
+
+def test_streams_not_due_are_left_alone(run, host, checker):
+    add_streams(run, host, "/etag/1")
+    assert run(checker.run_once()) == 1
+    assert run(checker.run_once()) == 0
+
+def test_stream_goes_offline_after_repeated_failures_and_back_live(run, host, checker, monkeypatch):
+    monkeypatch.setattr(server, "LIVE_CHECK_FAILURES_OFFLINE", 2)
+    add_streams(run, host, "/etag/1", viewers_count=120)
+    host.down.add("/etag/1")
+
+    check_round(run, checker)
+    state = stream_states(run)["/etag/1"]
+    assert state["is_live"] is True and state["check"]["failures"] == 1
+
+    check_round(run, checker)
+    state = stream_states(run)["/etag/1"]
+    assert state["is_live"] is False and state["viewers_count"] is None
+    assert checker.counters["went_offline"] == 1
+
+    host.down.clear()
+    before = datetime.now(timezone.utc)
+    check_round(run, checker)
+    state = stream_states(run)["/etag/1"]
+    assert state["is_live"] is True and state["check"]["failures"] == 0
+    assert state["started_at"].replace(tzinfo=timezone.utc) >= before - timedelta(seconds=1)
+    assert checker.counters["went_live"] == 1
+
+def test_many_streams_share_a_few_sockets(run, host, checker):
+    paths = [f"/{kind}/{i}" for i in range(20) for kind in ("changing", "etag", "no_head")]
+    add_streams(run, host, *paths)
+
+    for _ in range(3):
+        assert check_round(run, checker) == len(paths)
+    # Keep-alive connections are reused across probes and rounds
+    assert host.connections <= checker.max_connections
@@ -0,0 +1,77 @@
+"""Query plan verification: COLLSCAN detection, the --check-plans exit code and, on a real Mongo, every route query"""
+import os
+
+import pytest
+
+import server
+
+def explain(winning_plan, rejected=()):
+    return {"queryPlanner": {"winningPlan": winning_plan, "rejectedPlans": list(rejected)}, "ok": 1}
+
+INDEX_SCAN = {"stage": "LIMIT", "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN", "indexName": "published_at_id"}}}
+COLLECTION_SCAN = {"stage": "SORT", "inputStage": {"stage": "COLLSCAN", "direction": "forward"}}
+
+def test_find_plan_stages_walks_nested_stages():
+    assert [stage["indexName"] for stage in server.find_plan_stages(explain(INDEX_SCAN), "IXSCAN")] == ["published_at_id"]
+    assert len(server.find_plan_stages(explain(COLLECTION_SCAN), "COLLSCAN")) == 1
+    # $or plans list their branches under inputStages
+    or_plan = {"stage": "OR", "inputStages": [INDEX_SCAN, COLLECTION_SCAN]}
+    assert len(server.find_plan_stages(explain(or_plan), "COLLSCAN")) == 1
+
+def test_find_plan_stages_ignores_rejected_plans():
+    assert server.find_plan_stages(explain(INDEX_SCAN, rejected=[COLLECTION_SCAN]), "COLLSCAN") == []
+
+class ExplainingDatabase:
+    """Answers explain commands with a COLLSCAN for the collections in ``scanned``"""
+
+    def __init__(self, scanned):
+        self.scanned = scanned
+        self.explained = []
+
+    async def command(self, name, command, verbosity=None):
+        assert name == "explain" and verbosity == "queryPlanner"
+        self.explained.append(command["find"])
+        return explain(COLLECTION_SCAN if command["find"] in self.scanned else INDEX_SCAN)
+
+@pytest.fixture
+def explaining_db(monkeypatch):
+    async def ensure_indexes():
+        pass
+
+    monkeypatch.setattr(server, "ensure_indexes", ensure_indexes)
+
+    def install(scanned=()):
+        database = ExplainingDatabase(set(scanned))
+        monkeypatch.setattr(server, "db", database)
+        return database
+
+    return install
+
+def test_check_query_plans_names_the_queries_that_scan(run, explaining_db):
+    database = explaining_db(scanned={"live_streams"})
+
+    failures = run(server.check_query_plans())
+
+    assert len(database.explained) == len(server.plan_checks())
+    assert failures and all(name.startswith("live_streams:") for name in failures)
+    assert len(failures) == database.explained.count("live_streams")
+
+def test_check_plans_exits_non_zero_on_a_collscan(explaining_db, capsys):
+    explaining_db(scanned={"articles"})
+    assert server.main(["--check-plans"]) == 1
+    assert "COLLSCAN" in capsys.readouterr().out
+
+    explaining_db()
+    assert server.main(["--check-plans"]) == 0
+
+@pytest.mark.skipif(not os.environ.get("TEST_MONGO_URL"), reason="explain() needs a real Mongo: set TEST_MONGO_URL")
+def test_every_route_query_uses_an_index(run):
+    assert run(server.check_query_plans()) == []
+
+def test_plan_checks_explain_the_queries_production_runs():
+    checks = {name: command for name, _, command in server.plan_checks()}
+    # Cursors decode to BSON dates, which brings in the branch for string-dated articles
+    assert {"published_at": {"$type": "string"}} in checks["articles: next page"]["filter"]["$or"]
+    for name in ("search: sync", "hot set: poll", "trending: load", "dedup: backfill"):
+        branches = checks[name]["filter"]["$or"]
+        assert {type(branch["published_at"]["$gte"]) for branch in branches} == {server.datetime, str}
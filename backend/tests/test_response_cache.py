@@ -0,0 +1,25 @@
+"""ResponseCache keys and read-through behaviour"""
+import server
+
+def test_key_is_independent_of_parameter_order_and_skips_unset_ones():
+    assert server.ResponseCache.make_key("articles", {"limit": 20, "category": "crypto", "cursor": None}) == \
+        server.ResponseCache.make_key("articles", {"category": "crypto", "limit": 20})
+
+def test_escaped_values_cannot_collide_with_other_parameters():
+    smuggled = server.ResponseCache.make_key("live-streams", {"category": "crypto&region=us", "region": None})
+    real = server.ResponseCache.make_key("live-streams", {"category": "crypto", "region": "us"})
+    assert smuggled != real
+    assert server.ResponseCache.make_key("articles", {"cursor": "x&category=crypto"}) != \
+        server.ResponseCache.make_key("articles", {"cursor": "x", "category": "crypto"})
+
+def test_a_crafted_request_does_not_fill_the_real_entry(run):
+    cache = server.ResponseCache(server.MemoryCacheBackend())
+
+    async def nothing():
+        return []
+
+    async def streams():
+        return [{"id": "stream"}]
+
+    assert run(cache.get_or_compute("live-streams", {"category": "crypto&region=us", "region": None}, nothing, 60)) == []
+    assert run(cache.get_or_compute("live-streams", {"category": "crypto", "region": "us"}, streams, 60)) == [{"id": "stream"}]
@@ -0,0 +1,25 @@
+"""SearchIndex category codes"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+import server
+
+def article(number, category):
+    return {"id": f"a{number}", "title": f"bitcoin report {number}", "summary": "", "content": "",
+            "category": category, "tags": [], "published_at": datetime(2024, 5, 1, tzinfo=timezone.utc)}
+
+def test_more_than_256_categories_keep_their_own_articles(tmp_path):
+    index = server.SearchIndex(str(tmp_path / "index.npz"))
+    for number in range(300):
+        index.add(article(number, f"category-{number}"))
+
+    total, hits, facets = index.search("bitcoin", category="category-257")
+    assert total == 1 and hits[0][0] == "a257"
+    assert index.search("bitcoin", category="category-1")[1][0][0] == "a1"
+    assert len(facets["categories"]) == 1
+
+    # The codes survive a snapshot round trip
+    restored = server.SearchIndex(index.path)
+    restored.restore({name: np.asarray(value) for name, value in index.snapshot().items()})
+    assert restored.search("bitcoin", category="category-299")[1][0][0] == "a299"
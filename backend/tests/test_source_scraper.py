@@ -0,0 +1,150 @@
+"""SourceScraper against a local fixture server: conditional GETs, feeds and per-host throttling"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import server
+
+PAGE = (
+    b"<html><head><title>Markets</title></head><body><h1>Bitcoin ETF inflows hit a record</h1>"
+    b"<p>Spot ETFs took in more than a billion dollars in a single day.</p></body></html>"
+)
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves ``self.server.pages`` (path -> (body, headers)) and answers conditional requests with a 304"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append((self.path, dict(self.headers)))
+        if self.path not in self.server.pages:
+            return self.reply(500, {}, b"")
+        body, headers = self.server.pages[self.path]
+        etag, last_modified = headers.get("ETag"), headers.get("Last-Modified")
+        if (etag and self.headers.get("If-None-Match") == etag) or (
+            last_modified and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            return self.reply(304, headers, b"")
+        self.reply(200, headers, body)
+
+    def reply(self, status, headers, body):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def fixture_server(http_server):
+    httpd = http_server(FixtureHandler)
+    httpd.pages, httpd.requests, httpd.lock = {}, [], threading.Lock()
+    return httpd
+
+@pytest.fixture
+def scraper(run):
+    scraper = server.SourceScraper(rate=1000, burst=1000, parse_workers=0)
+    yield scraper
+    run(scraper.close())
+
+def add_source(run, **fields):
+    source = server.NewsSource(name="Fixture", category="crypto", **fields).dict()
+    # Unset rather than null: mongomock's $max cannot compare a date with null, Mongo can
+    run(server.db.news_sources.insert_one({name: value for name, value in source.items() if value is not None}))
+    return source
+
+def reload(run, source):
+    return run(server.db.news_sources.find_one({"id": source["id"]}, {"_id": 0}))
+
+def test_etag_makes_the_second_scrape_conditional(run, fixture_server, scraper):
+    fixture_server.pages["/page"] = (PAGE, {"ETag": '"v1"', "Content-Type": "text/html"})
+    source = add_source(run, url=f"{fixture_server.url}/page")
+
+    first = run(scraper.scrape(source))
+    assert first.status == "fetched"
+    assert first.title == "Markets" and "Bitcoin ETF inflows hit a record" in first.text
+    stored = reload(run, source)
+    assert stored["etag"] == '"v1"' and stored["last_scrape_status"] == "fetched"
+    assert stored["last_scraped"] is not None
+
+    second = run(scraper.scrape(stored))
+    assert second.status == "not_modified"
+    assert fixture_server.requests[-1][1].get("If-None-Match") == '"v1"'
+    assert reload(run, source)["last_scrape_status"] == "not_modified"
+
+def test_last_modified_makes_the_second_scrape_conditional(run, fixture_server, scraper):
+    last_modified = format_datetime(datetime(2024, 5, 1, tzinfo=timezone.utc), usegmt=True)
+    fixture_server.pages["/page"] = (PAGE, {"Last-Modified": last_modified, "Content-Type": "text/html"})
+    source = add_source(run, url=f"{fixture_server.url}/page")
+
+    assert run(scraper.scrape(source)).status == "fetched"
+    assert run(scraper.scrape(reload(run, source))).status == "not_modified"
+    assert fixture_server.requests[-1][1].get("If-Modified-Since") == last_modified
+
+def test_page_without_validators_is_unchanged_by_its_text(run, fixture_server, scraper):
+    fixture_server.pages["/page"] = (PAGE, {"Content-Type": "text/html"})
+    source = add_source(run, url=f"{fixture_server.url}/page")
+
+    assert run(scraper.scrape(source)).status == "fetched"
+    assert run(scraper.scrape(reload(run, source))).status == "unchanged"
+
+def test_server_error_is_recorded(run, fixture_server, scraper):
+    source = add_source(run, url=f"{fixture_server.url}/missing")
+
+    assert run(scraper.scrape(source)).status == "error"
+    assert reload(run, source)["last_scrape_status"] == "error"
+    assert scraper.counters["error"] == 1
+
+def test_requests_to_one_host_are_throttled(run, fixture_server):
+    fixture_server.pages["/page"] = (PAGE, {"Content-Type": "text/html"})
+    scraper = server.SourceScraper(rate=20, burst=1, parse_workers=0)
+    source = add_source(run, url=f"{fixture_server.url}/page")
+    try:
+        started = time.perf_counter()
+        for _ in range(4):
+            run(scraper.scrape(source))
+        # One request from the burst, then one every 1/20 s
+        assert time.perf_counter() - started >= 3 / 20 * 0.9
+    finally:
+        run(scraper.close())
+
+def rss(*items):
+    entries = "".join(
+        f"<item><guid>{guid}</guid><title>{title}</title><description>About {title}</description>"
+        f"<pubDate>{format_datetime(published_at)}</pubDate></item>"
+        for guid, title, published_at in items
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>Fixture</title>{entries}</channel></rss>'.encode()
+
+def test_feed_items_are_read_once_and_the_feed_is_then_not_modified(run, fixture_server, scraper, monkeypatch):
+    monkeypatch.setattr(server, "FEED_MAX_ITEMS_PER_RUN", 10)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    fixture_server.pages["/feed"] = (
+        rss(("b", "Second", now - timedelta(minutes=5)), ("a", "First", now - timedelta(minutes=10))),
+        {"ETag": '"feed-1"', "Content-Type": "application/rss+xml"},
+    )
+    source = add_source(run, url=f"{fixture_server.url}/page", ingestion_mode="feed", feed_url=f"{fixture_server.url}/feed")
+
+    feed = run(scraper.fetch_feed(source))
+    assert feed.status == "fetched"
+    assert [item.title for item in feed.items] == ["First", "Second"]
+    for item in feed.items:
+        run(scraper.mark_feed_item(source, item))
+    run(scraper.record_feed_validators(source, feed))
+
+    stored = reload(run, source)
+    assert stored["feed_etag"] == '"feed-1"'
+    assert run(scraper.fetch_feed(stored)).status == "not_modified"
+    assert fixture_server.requests[-1][1].get("If-None-Match") == '"feed-1"'
+
+    # Without the validator the feed is downloaded again, but its items are not new
+    stored["feed_etag"] = None
+    assert run(scraper.fetch_feed(stored)).status == "unchanged"